@@ -2,11 +2,38 @@
 
 from __future__ import annotations
 
+from time import perf_counter
+
+from homeassistant.components.bluetooth import (
+    BluetoothCallbackMatcher,
+    BluetoothChange,
+    BluetoothScanningMode,
+    BluetoothServiceInfoBleak,
+    async_register_callback,
+)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
+
+from .bridge import create_bridge_device
+from .const import (
+    CONFIG_BRIDGE,
+    CONFIG_BRIDGE_TOKEN,
+    CONFIG_TIMEOUT_PREFIX,
+    DEFAULT_TIMEOUTS,
+    DOMAIN,
+    HISTORY_SAVE_DELAY,
+    HISTORY_STORAGE_VERSION,
+)
+from .device_wrapper import async_remove_device, create_device
+from .history import WateringHistory
+from .services import async_setup_services
 
-from .const import DOMAIN
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 # TODO List the platforms that you want to support.
 # For your initial PR, limit it to 1 platform.
@@ -18,15 +45,115 @@ PLATFORMS: list[Platform] = [
 ]
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Spray-Mist-F638 services."""
+    async_setup_services(hass)
+    return True
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an old config entry."""
+    if entry.version == 1 and entry.minor_version < 2:
+        # MAC addresses typed in lower case never matched Bluetooth callbacks
+        old_mac = entry.data["mac"]
+        new_mac = old_mac.upper()
+        # device identifiers carry the MAC, keep the existing registry device
+        device_registry = dr.async_get(hass)
+        if new_mac != old_mac and (
+            device := device_registry.async_get_device(
+                identifiers={(DOMAIN, old_mac)}
+            )
+        ):
+            device_registry.async_update_device(
+                device.id, new_identifiers={(DOMAIN, new_mac)}
+            )
+        hass.config_entries.async_update_entry(
+            entry,
+            data={**entry.data, "mac": new_mac},
+            minor_version=2,
+        )
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Spray-Mist-F638 from a config entry."""
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    start = perf_counter()
+    timeouts = {
+        op: entry.options[CONFIG_TIMEOUT_PREFIX + op]
+        for op in DEFAULT_TIMEOUTS
+        if CONFIG_TIMEOUT_PREFIX + op in entry.options
+    }
+    if bridge := entry.options.get(CONFIG_BRIDGE):
+        try:
+            device = create_bridge_device(
+                entry.data["mac"],
+                entry.title,
+                bridge,
+                entry.options.get(CONFIG_BRIDGE_TOKEN, ""),
+                timeouts,
+            )
+        except ValueError as ex:
+            raise ConfigEntryError(str(ex)) from ex
+    else:
+        device = create_device(entry.data["mac"], entry.title, timeouts)
+    entry.runtime_data = device
+    try:
+        entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+        store = _history_store(hass, entry)
+        history = WateringHistory.from_dict(await store.async_load())
+        device.set_history(
+            history,
+            lambda: store.async_delay_save(history.as_dict, HISTORY_SAVE_DELAY),
+        )
+
+        @callback
+        def _async_advertisement(
+            service_info: BluetoothServiceInfoBleak, change: BluetoothChange
+        ) -> None:
+            """Keep the device available while it is advertising."""
+            device.advertisement_received()
+
+        entry.async_on_unload(
+            async_register_callback(
+                hass,
+                _async_advertisement,
+                BluetoothCallbackMatcher(address=entry.data["mac"]),
+                BluetoothScanningMode.PASSIVE,
+            )
+        )
+        forward_start = perf_counter()
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        end = perf_counter()
+        device.record_timing("platform_forwarding", end - forward_start)
+        device.record_timing("entry_setup", end - start)
+    except Exception:
+        # do not leave a half set up device and its handle in the registry
+        await async_remove_device(device.mac)
+        raise
     return True
 
 
+def _history_store(hass: HomeAssistant, entry: ConfigEntry) -> Store[dict]:
+    """Return the storage holding the watering history of an entry."""
+    return Store(hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.history.{entry.entry_id}")
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry so that changed bridge or timeout options take effect."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        device = entry.runtime_data
+        await _history_store(hass, entry).async_save(device.history.as_dict())
+        await async_remove_device(device.mac)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored watering history of a deleted entry."""
+    await _history_store(hass, entry).async_remove()
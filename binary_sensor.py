@@ -11,7 +11,7 @@ from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
-from .device_wrapper import WaterTimerDevice, create_device
+from .device_wrapper import WaterTimerDevice
 
 
 async def async_setup_entry(
@@ -28,7 +28,7 @@ async def async_setup_entry(
     :return: success
     :rtype: bool
     """
-    device = create_device(entry.data["mac"], entry.title)
+    device: WaterTimerDevice = entry.runtime_data
     add_entities_callback(
         [WaterTimerRunningStatus(entry, device), WaterTimerAutoStatus(entry, device)],
         False,
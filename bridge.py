@@ -0,0 +1,420 @@
+"""BLE bridge for sharing Spray-Mist-F638 water timers between several hosts.
+
+Only one host can hold a BLE connection to a water timer. The bridge server owns
+the device sessions and serves cached snapshots and queued commands to clients
+over newline delimited JSON on a TCP socket. Clients use BridgeDevice, which
+behaves like WaterTimerDevice, instead of talking to the radio.
+
+Every request carries a shared token, and the server only serves the MAC
+addresses it was started with. The token is sent in clear text, so expose the
+server on trusted networks only. Run the server standalone with::
+
+    WATERTIMER_BRIDGE_TOKEN=secret python -m custom_components.watertimer.bridge \
+        --host 0.0.0.0 --port 8638 --mac AA:BB:CC:DD:EE:FF --mac 11:22:33:44:55:66
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import hmac
+import json
+import logging
+import os
+from typing import Any, Iterable, Union
+
+from .const import BRIDGE_DEFAULT_PORT, OP_SESSION, OP_WRITE
+from . import device_wrapper
+from .device_wrapper import (
+    WaterTimerDevice,
+    WaterTimerError,
+    WaterTimerTimeout,
+    async_remove_device,
+    create_device,
+    devices,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+BRIDGE_METHODS = {
+    "switch_manual_on": "turn_manual_on",
+    "switch_manual_off": "turn_manual_off",
+    "set_pause_days": "set_pause_days",
+}
+
+
+def parse_bridge_address(address: str) -> tuple[str, int]:
+    """Splits a bridge address into host and port
+
+    :param address: address in host, host:port or [IPv6]:port form, a bare
+        IPv6 address is taken as host without port
+    :type address: str
+    :raises ValueError: if the address is malformed
+    :return: host and port
+    :rtype: tuple[str, int]
+    """
+    address = address.strip()
+    port: Union[str, None] = None
+    if address.startswith("["):
+        host, closed, rest = address[1:].partition("]")
+        if not closed or (rest and not rest.startswith(":")):
+            raise ValueError(f"Invalid bridge address: {address}")
+        port = rest[1:] if rest else None
+    elif address.count(":") == 1:
+        host, port = address.split(":")
+    else:
+        host = address
+    if not host:
+        raise ValueError(f"Missing bridge host: {address}")
+    if port is None:
+        return host, BRIDGE_DEFAULT_PORT
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Invalid bridge port: {port}")
+    return host, int(port)
+
+
+class BridgeUnauthorized(Exception):
+    """Error to indicate a request with a wrong token or an unknown device."""
+
+
+class BridgeUnreachable(WaterTimerError):
+    """Error to indicate the bridge server cannot be reached."""
+
+
+class BridgeServer:
+    """Serves water timer devices owned by this process to bridge clients"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        token: str,
+        macs: Iterable[str],
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._token = token.encode()
+        self._macs = {mac.upper() for mac in macs}
+        self._server: Union[asyncio.Server, None] = None
+        self._clients: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def port(self) -> int:
+        """Reports the port the server listens on
+
+        :return: bound port, useful when started on port 0
+        :rtype: int
+        """
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self) -> None:
+        """Starts listening for bridge clients"""
+        self._server = await asyncio.start_server(
+            self._handle_client, self._host, self._port
+        )
+        _LOGGER.info("Water timer bridge listening on %s:%d", self._host, self.port)
+
+    async def stop(self) -> None:
+        """Stops the server, disconnects the clients and shuts down the devices"""
+        if self._server is not None:
+            self._server.close()
+        # clients keep their connections open, close them so that the handlers
+        # finish and wait_closed does not wait for the clients forever
+        for writer in self._clients.values():
+            writer.close()
+        for mac in list(devices):
+            await async_remove_device(mac)
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answers requests of one client connection in order"""
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self._handle_request(json.loads(line))
+                except BridgeUnauthorized as ex:
+                    _LOGGER.warning("Water timer bridge request rejected: %s", ex)
+                    writer.write(
+                        json.dumps({"ok": False, "error": str(ex)}).encode() + b"\n"
+                    )
+                    await writer.drain()
+                    break
+                except WaterTimerTimeout as ex:
+                    response = {"ok": False, "error": str(ex), "timeout": True}
+                except Exception as ex:  # pylint: disable=broad-except
+                    _LOGGER.exception("Water timer bridge request failed")
+                    response = {"ok": False, "error": f"{type(ex).__name__}: {ex}"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            _LOGGER.debug("Water timer bridge client disconnected")
+        finally:
+            del self._clients[task]
+            writer.close()
+
+    async def _handle_request(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Executes a single client request
+
+        :param request: decoded request
+        :type request: dict[str, Any]
+        :raises BridgeUnauthorized: on a wrong token or a device not served
+        :return: response to send back
+        :rtype: dict[str, Any]
+        """
+        if not hmac.compare_digest(
+            str(request.get("token", "")).encode(), self._token
+        ):
+            raise BridgeUnauthorized("Invalid bridge token")
+        mac = str(request.get("mac", "")).upper()
+        if mac not in self._macs:
+            raise BridgeUnauthorized(f"Device not served by this bridge: {mac}")
+        device = create_device(mac, request.get("name", ""))
+        op = request["op"]
+        if op == "state":
+            await device.update(force=request.get("force", False))
+            return {"ok": True, "state": device.snapshot()}
+        if op == "call":
+            if request["method"] not in BRIDGE_METHODS:
+                raise ValueError(f"Method not allowed: {request['method']}")
+            method = getattr(device, BRIDGE_METHODS[request["method"]])
+            result = await method(*request.get("args", []))
+            return {"ok": True, "result": result, "state": device.snapshot()}
+        raise ValueError(f"Unknown operation: {op}")
+
+
+class BridgeDevice(WaterTimerDevice):
+    """Water timer device accessed through a bridge server instead of the radio"""
+
+    def __init__(
+        self,
+        mac: str,
+        name: str,
+        host: str,
+        port: int,
+        token: str,
+        timeouts: Union[dict[str, float], None] = None,
+    ) -> None:
+        super().__init__(mac, name, timeouts)
+        self._host = host
+        self._port = port
+        self._token = token
+        self._reader: Union[asyncio.StreamReader, None] = None
+        self._writer: Union[asyncio.StreamWriter, None] = None
+        self._request_lock = asyncio.Lock()
+
+    async def _request(self, timeout: float, **request) -> dict[str, Any]:
+        """Sends a request to the bridge server and waits for the response
+
+        :param timeout: deadline for the whole exchange in seconds
+        :type timeout: float
+        :raises WaterTimerTimeout: if the deadline was exceeded
+        :raises BridgeUnreachable: if the server cannot be reached
+        :raises WaterTimerError: if the server refused or failed the request
+        :return: decoded response
+        :rtype: dict[str, Any]
+        """
+        request.update(mac=self._mac, name=self._name, token=self._token)
+        async with self._request_lock:
+            try:
+                async with asyncio.timeout(timeout):
+                    if self._writer is None:
+                        self._reader, self._writer = await asyncio.open_connection(
+                            self._host, self._port
+                        )
+                    self._writer.write(json.dumps(request).encode() + b"\n")
+                    await self._writer.drain()
+                    line = await self._reader.readline()
+                if not line:
+                    raise ConnectionResetError("Bridge server closed the connection")
+            except TimeoutError as ex:
+                await self._close()
+                raise WaterTimerTimeout(
+                    f"Water timer device: {self._mac} bridge request timed out"
+                ) from ex
+            except OSError as ex:
+                await self._close()
+                raise BridgeUnreachable(
+                    f"Water timer bridge for {self._mac} unreachable: {ex}"
+                ) from ex
+            except asyncio.CancelledError:
+                await self._close()
+                raise
+        response = json.loads(line)
+        if not response["ok"]:
+            if response.get("timeout"):
+                raise WaterTimerTimeout(response["error"])
+            raise WaterTimerError(response["error"])
+        return response
+
+    async def _close(self) -> None:
+        """Closes the connection to the bridge server"""
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    def _apply_snapshot(self, state: dict[str, Any]) -> None:
+        """Copies a device snapshot received from the bridge server"""
+        self._last_success = (
+            datetime.fromisoformat(state["last_success"])
+            if state["last_success"]
+            else None
+        )
+        self._consecutive_failures = state["consecutive_failures"]
+        self._last_error = state["last_error"]
+        was_running = self._is_running
+        self._is_running = state["is_running"]
+        self._auto_mode_on = state["auto_mode_on"]
+        self._manual_mode_on = state["manual_mode_on"]
+        self._manual_mode_time = state["manual_mode_time"]
+        self._battery_level = state["battery_level"]
+        self._pause_days = state["pause_days"]
+        self._track_run(
+            was_running,
+            self._last_success.timestamp() if self._last_success else None,
+        )
+
+    async def _perform_update(self, force: bool = False):
+        """Fetches the device data cached by the bridge server"""
+        _LOGGER.debug("..Performing bridge update")
+        try:
+            response = await self._request(
+                self._timeouts[OP_SESSION], op="state", force=force
+            )
+        except TimeoutError as ex:
+            _LOGGER.warning("Water timer bridge for %s timed out: %s", self._mac, ex)
+            self._consecutive_failures += 1
+            self._last_error = "timeout"
+        except BridgeUnreachable as ex:
+            _LOGGER.warning("Water timer bridge for %s failed: %s", self._mac, ex)
+            self._consecutive_failures += 1
+            self._last_error = "bridge_unreachable"
+        except WaterTimerError as ex:
+            _LOGGER.warning("Water timer bridge for %s refused: %s", self._mac, ex)
+            self._consecutive_failures += 1
+            self._last_error = str(ex)
+        else:
+            self._apply_snapshot(response["state"])
+
+    async def update(self, force: bool = False):
+        """Updates device from the bridge, not more frequent than once / minute"""
+        now = datetime.now()
+        # entities poll together, let the first one fetch for all of them
+        async with self._lock:
+            if self._closed:
+                return
+            if now - self._last_update > timedelta(minutes=1) or force:
+                await self._tracked(self._perform_update(force))
+                self._last_update = now
+
+    async def _write(
+        self, method: str, *args, settings_changed: bool = False
+    ) -> bool:
+        """Queues a write on the bridge server and takes over the refreshed data"""
+        if self._closed:
+            return False
+        response = await self._tracked(
+            self._request(
+                self._timeouts[OP_WRITE] + self._timeouts[OP_SESSION],
+                op="call",
+                method=method,
+                args=list(args),
+            )
+        )
+        self._apply_snapshot(response["state"])
+        self._last_update = datetime.now()
+        return response["result"]
+
+    async def async_shutdown(self) -> None:
+        """Cancels pending requests and closes the bridge connection"""
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        async with self._request_lock:
+            await self._close()
+
+
+def create_bridge_device(
+    mac: str,
+    name: str,
+    address: str,
+    token: str,
+    timeouts: Union[dict[str, float], None] = None,
+) -> WaterTimerDevice:
+    """Creates a bridged WaterTimer device object or returns an existing one
+
+    :param mac: mac address
+    :type mac: str
+    :param name: name of the device to create
+    :type name: str
+    :param address: bridge server address in host or host:port form
+    :type address: str
+    :param token: shared token of the bridge server
+    :type token: str
+    :param timeouts: deadlines per operation type overriding the defaults
+    :type timeouts: dict[str, float], optional
+    :return: created or existing device object
+    :rtype: WaterTimerDevice
+    """
+    if mac not in devices:
+        devices[mac] = BridgeDevice(
+            mac, name, *parse_bridge_address(address), token, timeouts
+        )
+    return devices[mac]
+
+
+async def _serve(host: str, port: int, token: str, macs: list[str]) -> None:
+    """Runs the bridge server until cancelled"""
+    server = BridgeServer(host, port, token, macs)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    """Entry point of the standalone bridge daemon"""
+    parser = argparse.ArgumentParser(description="Spray-Mist-F638 BLE bridge")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=BRIDGE_DEFAULT_PORT)
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("WATERTIMER_BRIDGE_TOKEN"),
+        help="shared token, defaults to $WATERTIMER_BRIDGE_TOKEN",
+    )
+    parser.add_argument(
+        "--mac",
+        action="append",
+        required=True,
+        help="MAC address of a water timer to serve, repeat for more",
+    )
+    parser.add_argument("--debug", action="store_true", help="debug logging")
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        help="serve random data from a mocked driver instead of the radio",
+    )
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("a token is required, use --token or WATERTIMER_BRIDGE_TOKEN")
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+    # unlike inside Home Assistant, debug logging must not swap out the radio
+    device_wrapper.mock_driver = args.mock
+    try:
+        asyncio.run(_serve(args.host, args.port, args.token, args.mac))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,11 @@ from typing import Any
 
 import voluptuous as vol
 
+from homeassistant.components.bluetooth import (
+    BluetoothServiceInfoBleak,
+    async_discovered_service_info,
+    async_last_service_info,
+)
 from homeassistant.config_entries import (
     ConfigEntry,
     ConfigFlow,
@@ -17,7 +22,17 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.device_registry import format_mac
 
-from .const import CONFIG_MANUAL_TIME, DOMAIN
+from .bridge import parse_bridge_address
+from .const import (
+    CONFIG_BRIDGE,
+    CONFIG_BRIDGE_TOKEN,
+    CONFIG_MANUAL_TIME,
+    CONFIG_TIMEOUT_PREFIX,
+    CONNECT_PROBE_TIMEOUT,
+    DEFAULT_TIMEOUTS,
+    DOMAIN,
+    SERVICE_UUID,
+)
 from .device_wrapper import WaterTimerDevice
 
 _LOGGER = logging.getLogger(__name__)
@@ -29,21 +44,60 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
+    A recent advertisement with the water timer service UUID is accepted as proof
+    of reachability, otherwise a connect probe is run on the device's own worker.
     """
 
-    device = WaterTimerDevice(data["mac"], "")
-    # if not device.can_connect:
-    #    raise CannotConnect
+    service_info = async_last_service_info(hass, data["mac"], connectable=True)
+    if service_info is None or not is_water_timer(service_info):
+        device = WaterTimerDevice(data["mac"], "")
+        if not await device.async_probe(CONNECT_PROBE_TIMEOUT):
+            raise CannotConnect
 
     # Return info that you want to store in the config entry.
     return {"title": f"WaterTimer {data['mac']}"}
 
 
+def is_water_timer(service_info: BluetoothServiceInfoBleak) -> bool:
+    """Check if the advertisement comes from a Spray-Mist-F638 water timer."""
+    return SERVICE_UUID in service_info.service_uuids
+
+
 class WaterTimerConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Spray-Mist-F638."""
 
     VERSION = 1
-    MINOR_VERSION = 1
+    MINOR_VERSION = 2
+
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._discovery_info: BluetoothServiceInfoBleak | None = None
+
+    async def async_step_bluetooth(
+        self, discovery_info: BluetoothServiceInfoBleak
+    ) -> ConfigFlowResult:
+        """Handle a water timer discovered over Bluetooth."""
+        await self.async_set_unique_id(format_mac(discovery_info.address))
+        self._abort_if_unique_id_configured()
+        if not is_water_timer(discovery_info):
+            return self.async_abort(reason="not_supported")
+        self._discovery_info = discovery_info
+        self.context["title_placeholders"] = {"name": discovery_info.name}
+        return await self.async_step_bluetooth_confirm()
+
+    async def async_step_bluetooth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Confirm setup of a discovered water timer."""
+        assert self._discovery_info is not None
+        mac = self._discovery_info.address
+        if user_input is None:
+            self._set_confirm_only()
+            return self.async_show_form(
+                step_id="bluetooth_confirm",
+                description_placeholders={"name": self._discovery_info.name},
+            )
+        return self.async_create_entry(title=f"WaterTimer {mac}", data={"mac": mac})
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -51,10 +105,15 @@ class WaterTimerConfigFlow(ConfigFlow, domain=DOMAIN):
         """Handle the initial step."""
         if user_input is None:
             return self.async_show_form(
-                step_id="user", data_schema=STEP_USER_DATA_SCHEMA
+                step_id="user", data_schema=self._user_data_schema()
             )
 
         errors = {}
+        # Home Assistant Bluetooth addresses are upper case and compared exactly
+        user_input["mac"] = user_input["mac"].strip().upper()
+        # never probe a timer whose single connection a configured entry holds
+        await self.async_set_unique_id(format_mac(user_input["mac"]))
+        self._abort_if_unique_id_configured()
 
         try:
             info = await validate_input(self.hass, user_input)
@@ -64,14 +123,25 @@ class WaterTimerConfigFlow(ConfigFlow, domain=DOMAIN):
             _LOGGER.exception("Unexpected exception")
             errors["base"] = "unknown"
         else:
-            await self.async_set_unique_id(format_mac(user_input["mac"]))
-            self._abort_if_unique_id_configured()
             return self.async_create_entry(title=info["title"], data=user_input)
 
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="user", data_schema=self._user_data_schema(), errors=errors
         )
 
+    @callback
+    def _user_data_schema(self) -> vol.Schema:
+        """Build the user step schema suggesting unconfigured discovered timers."""
+        configured = self._async_current_ids()
+        discovered = [
+            info.address
+            for info in async_discovered_service_info(self.hass)
+            if is_water_timer(info) and format_mac(info.address) not in configured
+        ]
+        if not discovered:
+            return STEP_USER_DATA_SCHEMA
+        return vol.Schema({vol.Required("mac", default=discovered[0]): str})
+
     @staticmethod
     @callback
     def async_get_options_flow(
@@ -98,19 +168,43 @@ class WaterTimerOptionsFlowHandler(OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         """Handle a flow initialized by the user."""
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
-
+            try:
+                if user_input.get(CONFIG_BRIDGE):
+                    parse_bridge_address(user_input[CONFIG_BRIDGE])
+            except ValueError:
+                errors[CONFIG_BRIDGE] = "invalid_bridge"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        values = user_input or self.config_entry.options
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
                     vol.Required(
                         CONFIG_MANUAL_TIME,
-                        default=self.config_entry.options.get(CONFIG_MANUAL_TIME, 30),
-                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=120))
+                        default=values.get(CONFIG_MANUAL_TIME, 30),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=120)),
+                    vol.Optional(
+                        CONFIG_BRIDGE,
+                        default=values.get(CONFIG_BRIDGE, ""),
+                    ): str,
+                    vol.Optional(
+                        CONFIG_BRIDGE_TOKEN,
+                        default=values.get(CONFIG_BRIDGE_TOKEN, ""),
+                    ): str,
+                    **{
+                        vol.Required(
+                            CONFIG_TIMEOUT_PREFIX + op,
+                            default=values.get(CONFIG_TIMEOUT_PREFIX + op, default),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=1, max=600))
+                        for op, default in DEFAULT_TIMEOUTS.items()
+                    },
                 }
             ),
+            errors=errors,
         )
 
 
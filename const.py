@@ -1,4 +1,42 @@
 """Constants for the Spray-Mist-F638 integration."""
 
+from datetime import timedelta
+
 DOMAIN = "watertimer"
 CONFIG_MANUAL_TIME = "manual_time"
+
+SERVICE_GET_STATES = "get_states"
+ATTR_MAX_AGE = "max_age"
+MAX_PARALLEL_REFRESH = 3
+
+SERVICE_UUID = "0000fcc0-0000-1000-8000-00805f9b34fb"
+CONNECT_PROBE_TIMEOUT = 20
+
+OP_CONNECT = "connect"
+OP_READ = "read"
+OP_WRITE = "write"
+OP_SESSION = "session"
+DEFAULT_TIMEOUTS = {
+    OP_CONNECT: 15.0,
+    OP_READ: 10.0,
+    OP_WRITE: 10.0,
+    OP_SESSION: 60.0,
+}
+CONFIG_TIMEOUT_PREFIX = "timeout_"
+DISCONNECT_TIMEOUT = 5.0
+
+AVAILABILITY_MAX_FAILURES = 3
+AVAILABILITY_GRACE_PERIOD = timedelta(minutes=10)
+ADVERTISEMENT_FRESHNESS = timedelta(minutes=5)
+
+SETTINGS_REFRESH_INTERVAL = timedelta(hours=1)
+
+CONFIG_BRIDGE = "bridge"
+CONFIG_BRIDGE_TOKEN = "bridge_token"
+BRIDGE_DEFAULT_PORT = 8638
+
+HISTORY_SIZE = 256
+HISTORY_STORAGE_VERSION = 1
+HISTORY_SAVE_DELAY = 60
+# a stopped run ends at most this long after the last poll that saw it running
+RUN_END_TOLERANCE = timedelta(minutes=1)
@@ -1,41 +1,66 @@
+from __future__ import annotations
+
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import logging
 from random import randint
-from threading import RLock
-from time import sleep
-from typing import Union
+from time import perf_counter, time
+from types import ModuleType, SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Union
+
+from .const import (
+    ADVERTISEMENT_FRESHNESS,
+    AVAILABILITY_GRACE_PERIOD,
+    AVAILABILITY_MAX_FAILURES,
+    DEFAULT_TIMEOUTS,
+    DISCONNECT_TIMEOUT,
+    DOMAIN,
+    OP_CONNECT,
+    OP_READ,
+    OP_SESSION,
+    OP_WRITE,
+    RUN_END_TOLERANCE,
+    SETTINGS_REFRESH_INTERVAL,
+)
+from .history import WateringHistory
+
+if TYPE_CHECKING:
+    from spraymistf638.driver import RunningMode
 
-from spraymistf638.driver import RunningMode, SprayMistF638, WorkingMode
+_LOGGER = logging.getLogger(__name__)
 
-from .const import DOMAIN
+_driver: Union[ModuleType, SimpleNamespace, None] = None
+driver_import_time: Union[float, None] = None
+# None mocks the driver when debug logging is on, True or False force it
+mock_driver: Union[bool, None] = None
 
-_LOGGER = logging.getLogger(__name__)
 
-updatelock = RLock()
+def _mock_driver(driver: ModuleType) -> SimpleNamespace:
+    """Builds a mocked driver used in debug logging mode
 
-if _LOGGER.isEnabledFor(logging.DEBUG):
+    :param driver: real driver module providing specs and enums
+    :type driver: ModuleType
+    :return: driver replacement with a mocked device class
+    :rtype: SimpleNamespace
+    """
     from unittest.mock import Mock, PropertyMock
 
-    manual_mode = False
-    pause_days = randint(0, 7)
+    state = {"manual_mode": False, "pause_days": randint(0, 7)}
 
     def switch_manual_on(t):
         _LOGGER.debug("Water timer switched on for %s", t)
-        global manual_mode
-        manual_mode = True
+        state["manual_mode"] = True
 
     def switch_manual_off():
         _LOGGER.debug("Water timer switched off")
-        global manual_mode
-        manual_mode = False
+        state["manual_mode"] = False
 
     def set_pause_days(val: int):
         _LOGGER.debug(f"Pause days set to {val}")
-        global pause_days
-        pause_days = val
+        state["pause_days"] = val
 
-    SprayMistF638 = Mock(spec=SprayMistF638)
+    SprayMistF638 = Mock(spec=driver.SprayMistF638)
     SprayMistF638.return_value.connect = Mock(side_effect=lambda: randint(0, 3) != 0)
     type(SprayMistF638.return_value).running_mode = PropertyMock(
         side_effect=lambda: randint(0, 3)
@@ -47,35 +72,89 @@ if _LOGGER.isEnabledFor(logging.DEBUG):
         side_effect=lambda: randint(1, 100)
     )
     type(SprayMistF638.return_value).manual_on = PropertyMock(
-        side_effect=lambda: manual_mode
+        side_effect=lambda: state["manual_mode"]
     )
     type(SprayMistF638.return_value).manual_time = PropertyMock(
         side_effect=lambda: randint(1, 100)
     )
     type(SprayMistF638.return_value).pause_days = PropertyMock(
-        side_effect=lambda: pause_days
+        side_effect=lambda: state["pause_days"]
     )
     SprayMistF638.return_value.switch_manual_on = Mock(side_effect=switch_manual_on)
     SprayMistF638.return_value.switch_manual_off = Mock(side_effect=switch_manual_off)
     SprayMistF638.return_value.set_pause_days = Mock(side_effect=set_pause_days)
     _LOGGER.warning("Device is mocked in debug logging mode")
+    return SimpleNamespace(
+        SprayMistF638=SprayMistF638,
+        RunningMode=driver.RunningMode,
+        WorkingMode=driver.WorkingMode,
+    )
+
+
+def load_driver() -> Union[ModuleType, SimpleNamespace]:
+    """Imports the device driver on first use, blocking so run it in the executor
+
+    :return: driver module, mocked in debug logging mode
+    :rtype: ModuleType
+    """
+    global _driver, driver_import_time
+    if _driver is None:
+        start = perf_counter()
+        from spraymistf638 import driver
+
+        mock = mock_driver
+        if mock is None:
+            mock = _LOGGER.isEnabledFor(logging.DEBUG)
+        if mock:
+            driver = _mock_driver(driver)
+        _driver = driver
+        driver_import_time = perf_counter() - start
+        _LOGGER.debug("Water timer driver imported in %.3f s", driver_import_time)
+    return _driver
+
+
+class WaterTimerError(Exception):
+    """Error to indicate a failed device operation."""
+
+
+class WaterTimerTimeout(WaterTimerError, TimeoutError):
+    """Error to indicate a device operation exceeded its deadline."""
 
 
 class WaterTimerDevice:
     """AI is creating summary for"""
 
-    def __init__(self, mac: str, name: str) -> None:
+    def __init__(
+        self, mac: str, name: str, timeouts: Union[dict[str, float], None] = None
+    ) -> None:
         self._mac = mac
+        self._timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
         self._last_update = datetime.min
         self._name = name
-        self._is_available = False
+        self._consecutive_failures = 0
+        self._last_advertisement = None
         self._is_running = False
         self._battery_level = None
         self._auto_mode_on = False
         self._manual_mode_time = 30
         self._manual_mode_on = False
         self._pause_days = 0
-        self._device_handle = SprayMistF638(mac)
+        self._running_mode = None
+        self._settings_read = None
+        self._last_success = None
+        self._last_error = None
+        self._closed = False
+        self._lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+        self._timings: dict[str, float] = {}
+        self._history = WateringHistory()
+        self._history_listener: Union[Callable[[], None], None] = None
+        self._run_start: Union[float, None] = None
+        self._run_seen: Union[float, None] = None
+        self._run_manual = False
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._pending: Union[asyncio.Future, None] = None
+        self._device_handle = None
 
     @property
     def device_info(self) -> dict:
@@ -97,45 +176,420 @@ class WaterTimerDevice:
         """Updates device, not more frequent than once / minute"""
         _LOGGER.debug("Update called")
         now = datetime.now()
-        with updatelock:
+        async with self._lock:
+            if self._closed:
+                return
             if now - self._last_update > timedelta(minutes=1) or force:
-                await self._perform_update()
+                start = perf_counter()
+                await self._tracked(self._perform_update())
                 self._last_update = now
+                if "first_refresh" not in self._timings:
+                    self.record_timing("first_refresh", perf_counter() - start)
+                    _LOGGER.debug(
+                        "Water timer device: %s startup timings: %s",
+                        self._mac,
+                        self.startup_report(),
+                    )
+
+    def record_timing(self, phase: str, seconds: float) -> None:
+        """Records the duration of a startup phase
+
+        :param phase: name of the phase
+        :type phase: str
+        :param seconds: duration of the phase in seconds
+        :type seconds: float
+        """
+        self._timings[phase] = seconds
+
+    def startup_report(self) -> dict[str, Union[float, None]]:
+        """Reports the startup cost of the device in seconds per phase
+
+        :return: driver import, entry setup, platform forwarding and first
+            refresh durations, None for phases that did not happen yet
+        :rtype: dict[str, float]
+        """
+        return {
+            "driver_import": driver_import_time,
+            "entry_setup": self._timings.get("entry_setup"),
+            "platform_forwarding": self._timings.get("platform_forwarding"),
+            "first_refresh": self._timings.get("first_refresh"),
+        }
+
+    async def _tracked(self, coro) -> Any:
+        """Runs an operation so that shutdown can cancel it"""
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+
+    async def async_shutdown(self) -> None:
+        """Cancels pending operations, closes the connection and drops the handle"""
+        _LOGGER.debug("Shutting down water timer device: %s", self._mac)
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        async with self._lock:
+            await self._disconnect()
+            self._device_handle = None
+            if self._executor is not None:
+                # a hung driver call keeps its thread until the call returns,
+                # queued work including the disconnect still runs before exit
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _create_handle(self) -> None:
+        """Creates the driver handle, blocking so run it in the executor"""
+        if self._device_handle is None:
+            self._device_handle = load_driver().SprayMistF638(self._mac)
+
+    def _submit(self, func: Callable[..., Any], *args) -> asyncio.Future:
+        """Queues a blocking driver call on the device's own worker thread
+
+        The driver handle is not thread safe, so all calls of a device run on a
+        single worker, and a hung call cannot take threads of the shared
+        executor.
+
+        :param func: driver function to call
+        :type func: Callable
+        :return: future of the call result
+        :rtype: asyncio.Future
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"watertimer_{self._mac}"
+            )
+        self._pending = asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+        return self._pending
+
+    @property
+    def _busy(self) -> bool:
+        """Checks if a driver call abandoned after its deadline is still running
+
+        :return: if the worker thread is still occupied
+        :rtype: bool
+        """
+        return self._pending is not None and not self._pending.done()
+
+    async def _ensure_handle(self) -> None:
+        """Creates the driver handle when the first device session starts"""
+        if self._device_handle is None:
+            await self._submit(self._create_handle)
+
+    async def _call(self, operation: str, func: Callable[..., Any], *args) -> Any:
+        """Runs a blocking driver call in the executor under the operation deadline
+
+        :param operation: operation type selecting the deadline
+        :type operation: str
+        :param func: driver function to call
+        :type func: Callable
+        :raises WaterTimerTimeout: if the deadline was exceeded
+        :return: result of the driver call
+        :rtype: Any
+        """
+        try:
+            async with asyncio.timeout(self._timeouts[operation]):
+                return await asyncio.shield(self._submit(func, *args))
+        except TimeoutError as ex:
+            raise WaterTimerTimeout(
+                f"Water timer device: {self._mac} {operation} timed out"
+            ) from ex
+
+    async def _disconnect(self) -> None:
+        """Disconnects the device, also when the calling task gets cancelled"""
+        if self._device_handle is None:
+            return
+        if self._busy:
+            # runs once the hung call returns, no point in waiting for it
+            self._submit(self._device_handle.disconnect)
+            return
+
+        async def disconnect() -> None:
+            try:
+                async with asyncio.timeout(DISCONNECT_TIMEOUT):
+                    await asyncio.shield(
+                        self._submit(self._device_handle.disconnect)
+                    )
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.debug("Water timer device: %s disconnect failed", self._mac)
+
+        await asyncio.shield(disconnect())
+
+    def _read_status(self) -> tuple:
+        """Reads the frequently changing device values, runs in the executor"""
+        return (
+            self._device_handle.running_mode,
+            self._device_handle.battery_level,
+            self._device_handle.manual_time,
+            self._device_handle.manual_on,
+        )
+
+    def _read_settings(self) -> tuple:
+        """Reads the auto mode program settings, runs in the executor"""
+        return (
+            self._device_handle.working_mode,
+            self._device_handle.pause_days,
+        )
+
+    def _settings_stale(self, running_mode: RunningMode) -> bool:
+        """Checks if the program settings have to be read again
+
+        Settings change only through our own writes or the device buttons, so
+        they are re-read when invalidated by a write, when the running mode
+        changed since the last poll or when the refresh interval has passed.
+
+        :param running_mode: running mode read in the current poll
+        :type running_mode: RunningMode
+        :return: if settings should be read
+        :rtype: bool
+        """
+        return (
+            self._settings_read is None
+            or running_mode != self._running_mode
+            or datetime.now() - self._settings_read > SETTINGS_REFRESH_INTERVAL
+        )
+
+    def _skip_busy(self) -> bool:
+        """Reports a failed cycle if an earlier driver call is still running
+
+        :return: if the session has to be skipped
+        :rtype: bool
+        """
+        if not self._busy:
+            return False
+        _LOGGER.warning(
+            "Water timer device: %s previous call still running, skipping", self._mac
+        )
+        self._consecutive_failures += 1
+        self._last_error = "busy"
+        return True
 
     async def _perform_update(self):
         """Performs actual update of the device data"""
         _LOGGER.debug("..Performing update")
+        if self._skip_busy():
+            return
         try:
-            connected = False
-            for i in range(1, 6):
-                connected = self._device_handle.connect()
-                if connected:
-                    break
-                else:
-                    _LOGGER.info(
-                        "Water timer device: %s not connected retry %d",
-                        self._mac,
-                        i,
+            async with asyncio.timeout(self._timeouts[OP_SESSION]):
+                await self._ensure_handle()
+                connected = False
+                for i in range(1, 6):
+                    connected = await self._call(
+                        OP_CONNECT, self._device_handle.connect
                     )
-                    await asyncio.sleep(1)
+                    if connected:
+                        break
+                    else:
+                        _LOGGER.info(
+                            "Water timer device: %s not connected retry %d",
+                            self._mac,
+                            i,
+                        )
+                        await asyncio.sleep(1)
+                if connected:
+                    (
+                        running_mode,
+                        battery_level,
+                        manual_time,
+                        manual_on,
+                    ) = await self._call(OP_READ, self._read_status)
+                    settings = None
+                    if self._settings_stale(running_mode):
+                        settings = await self._call(OP_READ, self._read_settings)
             if connected:
-                self._is_available = True
-                self._is_running = self._device_handle.running_mode in [
-                    RunningMode.RunningAutomatic,
-                    RunningMode.RunningManual,
+                driver = load_driver()
+                was_running = self._is_running
+                self._consecutive_failures = 0
+                self._is_running = running_mode in [
+                    driver.RunningMode.RunningAutomatic,
+                    driver.RunningMode.RunningManual,
                 ]
-                self._auto_mode_on = (
-                    self._device_handle.working_mode == WorkingMode.Auto
-                )
-                self._battery_level = int(self._device_handle.battery_level)
-                self._manual_mode_time = self._device_handle.manual_time
-                self._manual_mode_on = self._device_handle.manual_on
-                self._pause_days = self._device_handle.pause_days
+                self._running_mode = running_mode
+                self._battery_level = int(battery_level)
+                self._manual_mode_time = manual_time
+                self._manual_mode_on = manual_on
+                self._track_run(was_running)
+                if settings is not None:
+                    working_mode, self._pause_days = settings
+                    self._auto_mode_on = working_mode == driver.WorkingMode.Auto
+                    self._settings_read = datetime.now()
+                self._last_success = datetime.now()
+                self._last_error = None
             else:
                 _LOGGER.warning("Water timer device: %s cannot be reached", self._mac)
-                self._is_available = False
+                self._consecutive_failures += 1
+                self._last_error = "cannot_connect"
+        except TimeoutError as ex:
+            _LOGGER.warning(
+                "Water timer device: %s update timed out: %s", self._mac, ex
+            )
+            self._consecutive_failures += 1
+            self._last_error = "timeout"
+        except Exception as ex:
+            self._consecutive_failures += 1
+            self._last_error = f"{type(ex).__name__}: {ex}"
+            raise
         finally:
-            self._device_handle.disconnect()
+            await self._disconnect()
+
+    def _track_run(self, was_running: bool, seen: Union[float, None] = None) -> None:
+        """Records a watering run in the history when the running state changed
+
+        The run ends at the last poll that saw it running plus one poll
+        interval, so polls that failed in between are not counted as watering.
+
+        :param was_running: running state before the current poll
+        :type was_running: bool
+        :param seen: timestamp of the observed state, defaults to now
+        :type seen: float, optional
+        """
+        if seen is None:
+            seen = time()
+        if self._is_running:
+            if not was_running or self._run_start is None:
+                self._run_start = seen
+                self._run_manual = self._manual_mode_on
+            self._run_seen = seen
+        elif was_running and self._run_start is not None:
+            end = min(seen, self._run_seen + RUN_END_TOLERANCE.total_seconds())
+            self._history.record(self._run_start, end, self._run_manual)
+            self._run_start = self._run_seen = None
+            if self._history_listener is not None:
+                self._history_listener()
+
+    @property
+    def history(self) -> WateringHistory:
+        """Returns the watering run history
+
+        :return: run history
+        :rtype: WateringHistory
+        """
+        return self._history
+
+    def set_history(
+        self,
+        history: WateringHistory,
+        listener: Union[Callable[[], None], None] = None,
+    ) -> None:
+        """Replaces the run history, e.g. with one restored from storage
+
+        :param history: run history to use
+        :type history: WateringHistory
+        :param listener: called whenever a run gets recorded
+        :type listener: Callable[[], None], optional
+        """
+        self._history = history
+        self._history_listener = listener
+
+    async def _write(
+        self, method: str, *args, settings_changed: bool = False
+    ) -> bool:
+        """Performs a write to the device followed by a refresh of its data
+
+        :param method: name of the driver method performing the write
+        :type method: str
+        :param settings_changed: if the write changes program settings
+        :type settings_changed: bool, optional
+        :raises WaterTimerTimeout: if the write exceeded its deadline
+        :raises WaterTimerError: if the driver failed
+        :return: if function succeeded
+        :rtype: bool
+        """
+        ret = False
+        async with self._lock:
+            if self._closed:
+                return ret
+            if self._skip_busy():
+                raise WaterTimerTimeout(
+                    f"Water timer device: {self._mac} previous call still running"
+                )
+            try:
+                if settings_changed:
+                    self._settings_read = None
+                await self._tracked(self._ensure_handle())
+                ret = await self._tracked(
+                    self._call(OP_WRITE, getattr(self._device_handle, method), *args)
+                )
+                await self._tracked(self._perform_update())
+                self._last_update = datetime.now()
+            except WaterTimerTimeout:
+                self._last_error = "timeout"
+                raise
+            except WaterTimerError:
+                raise
+            except Exception as ex:
+                raise WaterTimerError(
+                    f"Water timer device: {self._mac} {method} failed: {ex}"
+                ) from ex
+            finally:
+                await self._disconnect()
+        return ret
+
+    @property
+    def name(self) -> str:
+        """Returns the device name
+
+        :return: name of the device
+        :rtype: str
+        """
+        return self._name
+
+    @property
+    def last_success(self) -> Union[datetime, None]:
+        """Reports when the device data was last read successfully
+
+        :return: time of the last successful read, None if never read
+        :rtype: datetime
+        """
+        return self._last_success
+
+    @property
+    def age(self) -> Union[float, None]:
+        """Reports the age of the cached device data in seconds
+
+        :return: seconds since the last successful read, None if never read
+        :rtype: float
+        """
+        if self._last_success is None:
+            return None
+        return (datetime.now() - self._last_success).total_seconds()
+
+    @property
+    def last_error(self) -> Union[str, None]:
+        """Reports the error of the last update attempt
+
+        :return: error description, None if the last update succeeded
+        :rtype: str
+        """
+        return self._last_error
+
+    def snapshot(self) -> dict:
+        """Returns the cached device state without touching the device
+
+        :return: cached state of the device
+        :rtype: dict
+        """
+        return {
+            "name": self._name,
+            "available": self.available,
+            "consecutive_failures": self._consecutive_failures,
+            "last_success": (
+                self._last_success.isoformat() if self._last_success else None
+            ),
+            "age": self.age,
+            "last_error": self._last_error,
+            "is_running": self._is_running,
+            "auto_mode_on": self._auto_mode_on,
+            "manual_mode_on": self._manual_mode_on,
+            "manual_mode_time": self._manual_mode_time,
+            "battery_level": self._battery_level,
+            "pause_days": self._pause_days,
+            "watered_minutes_today": self._history.minutes_today(),
+            "watered_minutes_this_week": self._history.minutes_this_week(),
+        }
 
     @property
     def mac(self) -> str:
@@ -155,12 +609,32 @@ class WaterTimerDevice:
         """
         _LOGGER.debug("Reading can_connect")
         ret = False
+        self._create_handle()
         try:
             ret = self._device_handle.connect()
         finally:
             self._device_handle.disconnect()
         return ret
 
+    async def async_probe(self, timeout: float) -> bool:
+        """Checks connection to the device on its own worker under a deadline
+
+        The device is shut down afterwards, so use a throwaway device object.
+
+        :param timeout: deadline of the whole probe in seconds
+        :type timeout: float
+        :return: if connection was successful
+        :rtype: bool
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                await self._ensure_handle()
+                return bool(await self._call(OP_CONNECT, self._device_handle.connect))
+        except TimeoutError:
+            return False
+        finally:
+            await self.async_shutdown()
+
     @property
     def is_running(self) -> bool:
         """Checks if the device is active at the moment
@@ -193,13 +667,32 @@ class WaterTimerDevice:
 
     @property
     def available(self) -> bool:
-        """Reports if the device is connected
+        """Reports if the device is reachable
+
+        Single failed update cycles are tolerated: the device is reported
+        unavailable only after several consecutive failures, once the grace
+        period since the last successful read has passed and no fresh
+        advertisement has been seen.
 
         :return: if the device is available
         :rtype: bool
         """
         _LOGGER.debug("Reading availability")
-        return self._is_available
+        if self._last_success is None:
+            return False
+        if self._consecutive_failures < AVAILABILITY_MAX_FAILURES:
+            return True
+        now = datetime.now()
+        if now - self._last_success < AVAILABILITY_GRACE_PERIOD:
+            return True
+        return (
+            self._last_advertisement is not None
+            and now - self._last_advertisement < ADVERTISEMENT_FRESHNESS
+        )
+
+    def advertisement_received(self) -> None:
+        """Records that an advertisement from the device has been seen"""
+        self._last_advertisement = datetime.now()
 
     @property
     def battery_level(self) -> Union[int, None]:
@@ -229,14 +722,7 @@ class WaterTimerDevice:
         :return: if function succeeded
         :rtype: bool
         """
-        ret = False
-        with updatelock:
-            try:
-                ret = self._device_handle.switch_manual_on(time)
-                await self.update(force=True)
-            finally:
-                self._device_handle.disconnect()
-        return ret
+        return await self._write("switch_manual_on", time)
 
     async def turn_manual_off(self) -> bool:
         """Turn off device in manual mode
@@ -244,14 +730,7 @@ class WaterTimerDevice:
         :return: if function succeeded
         :rtype: bool
         """
-        ret = False
-        with updatelock:
-            try:
-                ret = self._device_handle.switch_manual_off()
-                await self.update(force=True)
-            finally:
-                self._device_handle.disconnect()
-        return ret
+        return await self._write("switch_manual_off")
 
     @property
     def manual_mode_time(self) -> int:
@@ -282,32 +761,39 @@ class WaterTimerDevice:
         :rtype: bool
         """
         _LOGGER.debug(f"Setting pause days: {value}")
-        ret = False
-        with updatelock:
-            try:
-                ret = self._device_handle.set_pause_days(value)
-                await self.update(force=True)
-            finally:
-                self._device_handle.disconnect()
-        return ret
+        return await self._write("set_pause_days", value, settings_changed=True)
 
 
 devices: dict[str, WaterTimerDevice] = dict()
 
 
-def create_device(mac: str, name: str) -> WaterTimerDevice:
+def create_device(
+    mac: str, name: str, timeouts: Union[dict[str, float], None] = None
+) -> WaterTimerDevice:
     """Creates a WaterTimer device object or returns an existing one by mac address
 
     :param mac: mac address
     :type mac: str
     :param name: name of the device to create
     :type name: str
+    :param timeouts: deadlines per operation type overriding the defaults
+    :type timeouts: dict[str, float], optional
     :return: created or existing device object
     :rtype: WaterTimerDevice
     """
     if mac in devices:
         return devices[mac]
     else:
-        dev = WaterTimerDevice(mac, name)
+        dev = WaterTimerDevice(mac, name, timeouts)
         devices[mac] = dev
         return dev
+
+
+async def async_remove_device(mac: str) -> None:
+    """Shuts down a WaterTimer device object and drops it from the registry
+
+    :param mac: mac address
+    :type mac: str
+    """
+    if (dev := devices.pop(mac, None)) is not None:
+        await dev.async_shutdown()
@@ -0,0 +1,21 @@
+"""Diagnostics support for the Spray-Mist-F638 integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .device_wrapper import WaterTimerDevice
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    device: WaterTimerDevice = entry.runtime_data
+    return {
+        "startup_timings": device.startup_report(),
+        "device": device.snapshot(),
+    }
@@ -0,0 +1,139 @@
+"""Watering run history of a Spray-Mist-F638 water timer."""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date, datetime
+from time import time
+from typing import Iterator, Union
+
+from .const import HISTORY_SIZE
+
+
+class WateringHistory:
+    """Ring buffer of the last watering runs with running statistics
+
+    Runs are kept in fixed size arrays, the oldest run is overwritten once the
+    buffer is full. Watered time of the current day and week is summed up as
+    runs are recorded, so reading the statistics does not scan the buffer.
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE) -> None:
+        self._size = size
+        self._start = array("d", [0.0]) * size
+        self._end = array("d", [0.0]) * size
+        self._manual = array("B", [0]) * size
+        self._next = 0
+        self._count = 0
+        self._day: Union[date, None] = None
+        self._day_seconds = 0.0
+        self._week: Union[tuple[int, int], None] = None
+        self._week_seconds = 0.0
+
+    def record(self, start: float, end: float, manual: bool) -> None:
+        """Records a finished run
+
+        :param start: run start as a POSIX timestamp
+        :type start: float
+        :param end: run end as a POSIX timestamp
+        :type end: float
+        :param manual: if the run was started in manual mode
+        :type manual: bool
+        """
+        self._start[self._next] = start
+        self._end[self._next] = end
+        self._manual[self._next] = manual
+        self._next = (self._next + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+        day = datetime.fromtimestamp(end).date()
+        week = day.isocalendar()[:2]
+        if day != self._day:
+            self._day = day
+            self._day_seconds = 0.0
+        if week != self._week:
+            self._week = week
+            self._week_seconds = 0.0
+        self._day_seconds += end - start
+        self._week_seconds += end - start
+
+    def runs(self) -> Iterator[tuple[float, float, bool]]:
+        """Iterates over recorded runs from the oldest to the newest
+
+        :return: start, end and manual flag of each run
+        :rtype: Iterator[tuple[float, float, bool]]
+        """
+        first = (self._next - self._count) % self._size
+        for i in range(self._count):
+            idx = (first + i) % self._size
+            yield self._start[idx], self._end[idx], bool(self._manual[idx])
+
+    @property
+    def last_run(self) -> Union[tuple[float, float, bool], None]:
+        """Reports the most recent run
+
+        :return: start, end and manual flag, None if nothing was recorded
+        :rtype: tuple[float, float, bool]
+        """
+        if not self._count:
+            return None
+        idx = (self._next - 1) % self._size
+        return self._start[idx], self._end[idx], bool(self._manual[idx])
+
+    def minutes_today(self, now: Union[float, None] = None) -> float:
+        """Reports minutes watered today
+
+        :param now: current POSIX timestamp, defaults to the current time
+        :type now: float, optional
+        :return: watered minutes
+        :rtype: float
+        """
+        day = datetime.fromtimestamp(time() if now is None else now).date()
+        return self._day_seconds / 60 if day == self._day else 0.0
+
+    def minutes_this_week(self, now: Union[float, None] = None) -> float:
+        """Reports minutes watered in the current ISO week
+
+        :param now: current POSIX timestamp, defaults to the current time
+        :type now: float, optional
+        :return: watered minutes
+        :rtype: float
+        """
+        day = datetime.fromtimestamp(time() if now is None else now).date()
+        return self._week_seconds / 60 if day.isocalendar()[:2] == self._week else 0.0
+
+    def as_dict(self) -> dict:
+        """Serializes the history for storage
+
+        :return: JSON compatible data
+        :rtype: dict
+        """
+        return {
+            "runs": [list(run) for run in self.runs()],
+            "day": self._day.isoformat() if self._day else None,
+            "day_seconds": self._day_seconds,
+            "week": list(self._week) if self._week else None,
+            "week_seconds": self._week_seconds,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Union[dict, None]) -> WateringHistory:
+        """Restores a history saved by as_dict
+
+        :param data: stored data, None for an empty history
+        :type data: dict, optional
+        :return: restored history
+        :rtype: WateringHistory
+        """
+        data = data or {}
+        history = cls()
+        for start, end, manual in data.get("runs", []):
+            history.record(start, end, manual)
+        if data.get("day"):
+            # totals may include runs already dropped from the buffer
+            history._day = date.fromisoformat(data["day"])
+            history._day_seconds = data["day_seconds"]
+        if data.get("week"):
+            history._week = tuple(data["week"])
+            history._week_seconds = data["week_seconds"]
+        return history
@@ -4,11 +4,12 @@ from homeassistant.components.number import DOMAIN as SENSOR_DOMAIN, NumberEntit
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfTime
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import CONFIG_MANUAL_TIME, DOMAIN
-from .device_wrapper import WaterTimerDevice, create_device
+from .device_wrapper import WaterTimerDevice, WaterTimerError
 
 
 async def async_setup_entry(
@@ -25,7 +26,7 @@ async def async_setup_entry(
     :return: success
     :rtype: bool
     """
-    device = create_device(entry.data["mac"], entry.title)
+    device: WaterTimerDevice = entry.runtime_data
     add_entities_callback([WaterTimerPauseDaysEntity(entry, device)], False)
 
 
@@ -72,4 +73,7 @@ class WaterTimerPauseDaysEntity(NumberEntity):
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
-        await self._dev.set_pause_days(int(value))
+        try:
+            await self._dev.set_pause_days(int(value))
+        except WaterTimerError as ex:
+            raise HomeAssistantError(str(ex)) from ex
@@ -11,9 +11,10 @@ from homeassistant.const import PERCENTAGE, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
 
 from .const import CONFIG_MANUAL_TIME, DOMAIN
-from .device_wrapper import WaterTimerDevice, create_device
+from .device_wrapper import WaterTimerDevice
 
 
 async def async_setup_entry(
@@ -30,11 +31,14 @@ async def async_setup_entry(
     :return: success
     :rtype: bool
     """
-    device = create_device(entry.data["mac"], entry.title)
+    device: WaterTimerDevice = entry.runtime_data
     add_entities_callback(
         [
             WaterTimerBatteryStatus(entry, device),
             WaterTimerManualModeTime(entry, device),
+            WaterTimerWateredToday(entry, device),
+            WaterTimerWateredThisWeek(entry, device),
+            WaterTimerLastRun(entry, device),
         ],
         False,
     )
@@ -127,3 +131,125 @@ class WaterTimerManualModeTime(SensorEntity):
     def available(self) -> bool:
         """Return True if entity is available."""
         return self._dev.available
+
+
+class WaterTimerWateredToday(SensorEntity):
+    """Minutes watered today, taken from the run history"""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    _attr_icon = "mdi:water"
+
+    def __init__(self, entry: ConfigEntry, device: WaterTimerDevice) -> None:
+        self._dev = device
+        self._integration_name = entry.title
+        self.entity_id = (
+            f"{SENSOR_DOMAIN}.{DOMAIN}.{format_mac(self._dev.mac)}.watered-today"
+        )
+
+    @property
+    def device_info(self):
+        return self._dev.device_info
+
+    @property
+    def name(self):
+        """Name of the entity."""
+        return f"Watered today of {self._integration_name}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{format_mac(self._dev.mac)}.watered-today"
+
+    async def async_update(self) -> None:
+        await self._dev.update()
+        self._attr_native_value = round(self._dev.history.minutes_today(), 1)
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return self._dev.available
+
+
+class WaterTimerWateredThisWeek(SensorEntity):
+    """Minutes watered in the current week, taken from the run history"""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    _attr_icon = "mdi:water"
+
+    def __init__(self, entry: ConfigEntry, device: WaterTimerDevice) -> None:
+        self._dev = device
+        self._integration_name = entry.title
+        self.entity_id = (
+            f"{SENSOR_DOMAIN}.{DOMAIN}.{format_mac(self._dev.mac)}.watered-this-week"
+        )
+
+    @property
+    def device_info(self):
+        return self._dev.device_info
+
+    @property
+    def name(self):
+        """Name of the entity."""
+        return f"Watered this week of {self._integration_name}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{format_mac(self._dev.mac)}.watered-this-week"
+
+    async def async_update(self) -> None:
+        await self._dev.update()
+        self._attr_native_value = round(self._dev.history.minutes_this_week(), 1)
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return self._dev.available
+
+
+class WaterTimerLastRun(SensorEntity):
+    """End time of the last watering run, taken from the run history"""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_icon = "mdi:history"
+
+    def __init__(self, entry: ConfigEntry, device: WaterTimerDevice) -> None:
+        self._dev = device
+        self._integration_name = entry.title
+        self.entity_id = (
+            f"{SENSOR_DOMAIN}.{DOMAIN}.{format_mac(self._dev.mac)}.last-run"
+        )
+
+    @property
+    def device_info(self):
+        return self._dev.device_info
+
+    @property
+    def name(self):
+        """Name of the entity."""
+        return f"Last run of {self._integration_name}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{format_mac(self._dev.mac)}.last-run"
+
+    async def async_update(self) -> None:
+        await self._dev.update()
+        last_run = self._dev.history.last_run
+        if last_run is None:
+            self._attr_native_value = None
+            return
+        start, end, manual = last_run
+        self._attr_native_value = dt_util.utc_from_timestamp(end)
+        self._attr_extra_state_attributes = {
+            "start": dt_util.utc_from_timestamp(start).isoformat(),
+            "duration_minutes": round((end - start) / 60, 1),
+            "mode": "manual" if manual else "auto",
+        }
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return self._dev.available
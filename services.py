@@ -0,0 +1,80 @@
+"""Services for the Spray-Mist-F638 integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+
+from .const import ATTR_MAX_AGE, DOMAIN, MAX_PARALLEL_REFRESH, SERVICE_GET_STATES
+from .device_wrapper import WaterTimerDevice, devices
+
+_LOGGER = logging.getLogger(__name__)
+
+GET_STATES_SCHEMA = vol.Schema(
+    {vol.Optional(ATTR_MAX_AGE): vol.All(vol.Coerce(float), vol.Range(min=0))}
+)
+
+
+async def _refresh_stale(max_age: float) -> None:
+    """Refreshes devices whose cached data is older than max_age seconds
+
+    Device updates hold only their own device lock and run driver calls on the
+    device's worker thread, so stale devices are refreshed concurrently, with at
+    most MAX_PARALLEL_REFRESH radio sessions at a time.
+
+    :param max_age: maximum accepted age of the cached data in seconds
+    :type max_age: float
+    """
+    stale = [
+        dev for dev in devices.values() if dev.age is None or dev.age > max_age
+    ]
+    if not stale:
+        return
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_REFRESH)
+
+    async def refresh(dev: WaterTimerDevice) -> None:
+        async with semaphore:
+            try:
+                await dev.update(force=True)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Refresh of water timer %s failed", dev.mac)
+
+    # a device unloaded meanwhile cancels its own refresh, not the whole call
+    await asyncio.gather(*(refresh(dev) for dev in stale), return_exceptions=True)
+
+
+async def async_get_states(call: ServiceCall) -> ServiceResponse:
+    """Returns cached state of all registered water timers
+
+    :param call: service call data
+    :type call: ServiceCall
+    :return: device snapshots keyed by mac address
+    :rtype: ServiceResponse
+    """
+    if (max_age := call.data.get(ATTR_MAX_AGE)) is not None:
+        await _refresh_stale(max_age)
+    return {"devices": {mac: dev.snapshot() for mac, dev in devices.items()}}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Registers the integration services
+
+    :param hass: reference to HASS
+    :type hass: HomeAssistant
+    """
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_STATES,
+        async_get_states,
+        schema=GET_STATES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
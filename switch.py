@@ -7,11 +7,12 @@ from homeassistant.components.switch import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import CONFIG_MANUAL_TIME, DOMAIN
-from .device_wrapper import WaterTimerDevice, create_device
+from .device_wrapper import WaterTimerDevice, WaterTimerError
 
 
 async def async_setup_entry(
@@ -28,7 +29,7 @@ async def async_setup_entry(
     :return: success
     :rtype: bool
     """
-    device = create_device(entry.data["mac"], entry.title)
+    device: WaterTimerDevice = entry.runtime_data
     add_entities_callback([WaterTimerManualSwitch(entry, device)], False)
 
 
@@ -69,15 +70,21 @@ class WaterTimerManualSwitch(SwitchEntity):
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn the entity on."""
-        await self._dev.turn_manual_on(
-            self.platform.config_entry.options.get(CONFIG_MANUAL_TIME, 0)
-            if self.platform is not None and self.platform.config_entry is not None
-            else 0
-        )
+        try:
+            await self._dev.turn_manual_on(
+                self.platform.config_entry.options.get(CONFIG_MANUAL_TIME, 0)
+                if self.platform is not None and self.platform.config_entry is not None
+                else 0
+            )
+        except WaterTimerError as ex:
+            raise HomeAssistantError(str(ex)) from ex
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn the entity off."""
-        await self._dev.turn_manual_off()
+        try:
+            await self._dev.turn_manual_off()
+        except WaterTimerError as ex:
+            raise HomeAssistantError(str(ex)) from ex
 
     @property
     def is_on(self):
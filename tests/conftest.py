@@ -0,0 +1,83 @@
+"""Test setup for the Spray-Mist-F638 integration.
+
+The integration modules that do not need Home Assistant are imported through a
+bare package alias, so the package __init__ (which imports Home Assistant) is
+not executed. The spraymistf638 driver is replaced by an in-memory stub.
+"""
+
+import enum
+from pathlib import Path
+import sys
+import types
+
+PACKAGE = "watertimer"
+
+
+class RunningMode(enum.IntEnum):
+    """Stub of the driver running mode."""
+
+    Stopped = 0
+    RunningAutomatic = 1
+    RunningManual = 2
+
+
+class WorkingMode(enum.IntEnum):
+    """Stub of the driver working mode."""
+
+    Manual = 0
+    Auto = 1
+
+
+class SprayMistF638:
+    """Stub of the driver device handle."""
+
+    instances = 0
+
+    def __init__(self, mac: str) -> None:
+        SprayMistF638.instances += 1
+        self.mac = mac
+        self.connected = False
+        self.manual_on = False
+        self.pause_days = 0
+        self.running_mode = RunningMode.Stopped
+        self.working_mode = WorkingMode.Auto
+        self.battery_level = 80
+        self.manual_time = 15
+
+    def __del__(self) -> None:
+        SprayMistF638.instances -= 1
+
+    def connect(self) -> bool:
+        self.connected = True
+        return True
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+    def switch_manual_on(self, time: int) -> bool:
+        self.manual_on = True
+        self.running_mode = RunningMode.RunningManual
+        return True
+
+    def switch_manual_off(self) -> bool:
+        self.manual_on = False
+        self.running_mode = RunningMode.Stopped
+        return True
+
+    def set_pause_days(self, value: int) -> bool:
+        self.pause_days = value
+        return True
+
+
+_driver = types.ModuleType("spraymistf638.driver")
+_driver.RunningMode = RunningMode
+_driver.WorkingMode = WorkingMode
+_driver.SprayMistF638 = SprayMistF638
+_library = types.ModuleType("spraymistf638")
+_library.driver = _driver
+sys.modules.setdefault("spraymistf638", _library)
+sys.modules.setdefault("spraymistf638.driver", _driver)
+
+_package = types.ModuleType(PACKAGE)
+_package.__path__ = [str(Path(__file__).parent.parent)]
+sys.modules.setdefault(PACKAGE, _package)
@@ -0,0 +1,104 @@
+"""End to end tests of the water timer bridge on localhost."""
+
+import asyncio
+
+import pytest
+
+from watertimer.bridge import BridgeDevice, BridgeServer, parse_bridge_address
+from watertimer.device_wrapper import WaterTimerError, devices
+
+MAC = "AA:BB:CC:DD:EE:FF"
+TOKEN = "secret"
+
+
+@pytest.mark.parametrize(
+    ("address", "expected"),
+    [
+        ("bridge.local", ("bridge.local", 8638)),
+        ("bridge.local:9000", ("bridge.local", 9000)),
+        ("::1", ("::1", 8638)),
+        ("[::1]", ("::1", 8638)),
+        ("[fe80::1]:9000", ("fe80::1", 9000)),
+    ],
+)
+def test_parse_bridge_address(address, expected):
+    assert parse_bridge_address(address) == expected
+
+
+@pytest.mark.parametrize(
+    "address", ["host:abc", "host:0", "host:70000", ":9000", "[::1", "[::1]x", ""]
+)
+def test_parse_bridge_address_invalid(address):
+    with pytest.raises(ValueError):
+        parse_bridge_address(address)
+
+
+def test_bridge_serves_clients_and_rejects_strangers():
+    async def run() -> None:
+        server = BridgeServer("127.0.0.1", 0, TOKEN, [MAC.lower()])
+        await server.start()
+        clients = [
+            BridgeDevice(MAC, "WaterTimer", "127.0.0.1", server.port, TOKEN)
+            for _ in range(3)
+        ]
+        wrong_token = BridgeDevice(MAC, "x", "127.0.0.1", server.port, "wrong")
+        unknown = BridgeDevice("ZZ:99", "x", "127.0.0.1", server.port, TOKEN)
+
+        await asyncio.gather(*(client.update(force=True) for client in clients))
+        assert all(client.available for client in clients)
+        assert await clients[0].set_pause_days(4)
+        assert clients[0].pause_days == 4
+
+        await wrong_token.update(force=True)
+        await unknown.update(force=True)
+        assert wrong_token.last_error == "Invalid bridge token"
+        assert not unknown.available
+        assert list(devices) == [MAC]
+
+        # clients stay connected, stopping must not wait for them
+        await asyncio.wait_for(server.stop(), 5)
+        assert not devices
+        for client in [*clients, wrong_token, unknown]:
+            await client.async_shutdown()
+
+    asyncio.run(run())
+
+
+def test_bridge_write_errors_are_water_timer_errors():
+    async def run() -> None:
+        server = BridgeServer("127.0.0.1", 0, TOKEN, [MAC])
+        await server.start()
+        refused = BridgeDevice(MAC, "x", "127.0.0.1", server.port, "wrong")
+        with pytest.raises(WaterTimerError):
+            await refused.turn_manual_on(5)
+        await server.stop()
+
+        unreachable = BridgeDevice(MAC, "x", "127.0.0.1", server.port, TOKEN)
+        with pytest.raises(WaterTimerError):
+            await unreachable.set_pause_days(1)
+        for client in (refused, unreachable):
+            await client.async_shutdown()
+
+    asyncio.run(run())
+
+
+def test_bridge_entities_polling_together_share_one_request():
+    async def run() -> None:
+        server = BridgeServer("127.0.0.1", 0, TOKEN, [MAC])
+        await server.start()
+        client = BridgeDevice(MAC, "x", "127.0.0.1", server.port, TOKEN)
+        requests = 0
+        original = client._request
+
+        async def counting_request(*args, **kwargs):
+            nonlocal requests
+            requests += 1
+            return await original(*args, **kwargs)
+
+        client._request = counting_request
+        await asyncio.gather(*(client.update() for _ in range(6)))
+        assert requests == 1
+        await client.async_shutdown()
+        await server.stop()
+
+    asyncio.run(run())
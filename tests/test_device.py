@@ -0,0 +1,91 @@
+"""Tests of the water timer device wrapper against the stub driver."""
+
+import asyncio
+import time
+
+from spraymistf638.driver import RunningMode, SprayMistF638
+from watertimer.const import AVAILABILITY_GRACE_PERIOD
+from watertimer import device_wrapper
+from watertimer.device_wrapper import WaterTimerDevice
+
+MAC = "AA:BB:CC:DD:EE:FF"
+
+
+def test_probe_releases_worker():
+    device = WaterTimerDevice(MAC, "")
+    assert asyncio.run(device.async_probe(5))
+    assert device._executor is None
+    assert device._device_handle is None
+
+
+def test_probe_of_hung_device_times_out(monkeypatch):
+    def hang(self):
+        time.sleep(1)
+        return True
+
+    monkeypatch.setattr(SprayMistF638, "connect", hang)
+    device = WaterTimerDevice(MAC, "")
+    start = time.perf_counter()
+    assert not asyncio.run(device.async_probe(0.2))
+    assert time.perf_counter() - start < 1
+    assert device._executor is None
+
+
+def test_driver_errors_count_as_failures(monkeypatch):
+    async def run(device: WaterTimerDevice) -> None:
+        await device.update(force=True)
+        assert device.available
+
+        def fail(self):
+            raise OSError("radio gone")
+
+        monkeypatch.setattr(WaterTimerDevice, "_read_status", fail)
+        for _ in range(10):
+            try:
+                await device.update(force=True)
+            except OSError:
+                pass
+        assert device._consecutive_failures == 10
+        assert device.last_error == "OSError: radio gone"
+        # still inside the grace period since the last successful read
+        assert device.available
+        device._last_success -= AVAILABILITY_GRACE_PERIOD
+        assert not device.available
+        await device.async_shutdown()
+
+    asyncio.run(run(WaterTimerDevice(MAC, "")))
+
+
+def test_run_ends_at_last_poll_seen_running(monkeypatch):
+    clock = [1_700_000_000.0]
+    status = [RunningMode.RunningManual]
+    monkeypatch.setattr(device_wrapper, "time", lambda: clock[0])
+
+    def read_status(self):
+        if status[0] is None:
+            raise OSError("radio gone")
+        return status[0], 80, 15, status[0] == RunningMode.RunningManual
+
+    monkeypatch.setattr(WaterTimerDevice, "_read_status", read_status)
+
+    async def run(device: WaterTimerDevice) -> None:
+        async def poll(at: float) -> None:
+            clock[0] = at
+            try:
+                await device.update(force=True)
+            except OSError:
+                pass
+
+        start = clock[0]
+        await poll(start)
+        await poll(start + 60)
+        # the device is out of reach for an hour and stops in the meantime
+        status[0] = None
+        await poll(start + 120)
+        await poll(start + 1800)
+        status[0] = RunningMode.Stopped
+        await poll(start + 3600)
+        assert device.history.last_run == (start, start + 120, True)
+        await device.async_shutdown()
+
+    asyncio.run(run(WaterTimerDevice(MAC, "")))
@@ -0,0 +1,57 @@
+"""Tests of the watering run history."""
+
+from datetime import datetime
+
+from watertimer.history import WateringHistory
+
+# Sunday of ISO week 2024-W10, the next day starts week 11
+SUNDAY = datetime(2024, 3, 10, 8).timestamp()
+MONDAY = datetime(2024, 3, 11, 8).timestamp()
+
+
+def test_ring_wraps_around():
+    history = WateringHistory(size=3)
+    for i in range(5):
+        history.record(SUNDAY + i * 600, SUNDAY + i * 600 + 60, i % 2 == 0)
+    runs = list(history.runs())
+    assert [start for start, _, _ in runs] == [SUNDAY + i * 600 for i in (2, 3, 4)]
+    assert history.last_run == (SUNDAY + 2400, SUNDAY + 2460, True)
+    # totals keep the runs that were overwritten
+    assert history.minutes_today(SUNDAY) == 5
+
+
+def test_day_and_week_rollover():
+    history = WateringHistory()
+    history.record(SUNDAY, SUNDAY + 600, False)
+    assert history.minutes_today(SUNDAY) == 10
+    assert history.minutes_this_week(SUNDAY) == 10
+    # a new day and ISO week without any run reads as nothing watered
+    assert history.minutes_today(MONDAY) == 0
+    assert history.minutes_this_week(MONDAY) == 0
+
+    history.record(MONDAY, MONDAY + 300, True)
+    assert history.minutes_today(MONDAY) == 5
+    assert history.minutes_this_week(MONDAY) == 5
+
+    tuesday = MONDAY + 86400
+    history.record(tuesday, tuesday + 120, False)
+    assert history.minutes_today(tuesday) == 2
+    assert history.minutes_this_week(tuesday) == 7
+
+
+def test_round_trip_keeps_totals():
+    history = WateringHistory(size=2)
+    for i in range(4):
+        history.record(MONDAY + i * 600, MONDAY + i * 600 + 60, False)
+    restored = WateringHistory.from_dict(history.as_dict())
+    assert list(restored.runs()) == list(history.runs())
+    assert restored.minutes_today(MONDAY) == 4
+    assert restored.minutes_this_week(MONDAY) == 4
+    assert restored.as_dict() == history.as_dict()
+
+
+def test_restore_empty():
+    history = WateringHistory.from_dict(None)
+    assert history.last_run is None
+    assert history.minutes_today() == 0
+    assert history.as_dict()["runs"] == []
@@ -0,0 +1,84 @@
+"""Stress test of the water timer device lifecycle across entry reloads."""
+
+import asyncio
+import gc
+import threading
+import tracemalloc
+import weakref
+
+from spraymistf638.driver import SprayMistF638
+from watertimer.device_wrapper import async_remove_device, create_device, devices
+
+MAC = "AA:BB:CC:DD:EE:FF"
+RELOADS = 200
+
+
+async def _setup_and_unload() -> weakref.ref:
+    """Mimic async_setup_entry, some polls and writes, then async_unload_entry."""
+    device = create_device(MAC, "WaterTimer")
+    await device.update(force=True)
+    await device.turn_manual_on(5)
+    await device.turn_manual_off()
+    await device.set_pause_days(2)
+    await async_remove_device(MAC)
+
+    assert MAC not in devices
+    assert device._device_handle is None
+    assert device._executor is None
+    assert not device._tasks
+    return weakref.ref(device)
+
+
+async def _reload_loop(count: int) -> list[weakref.ref]:
+    return [await _setup_and_unload() for _ in range(count)]
+
+
+def test_reload_keeps_resources_flat():
+    """Devices, handles, worker threads and memory stay flat across reloads."""
+    asyncio.run(_reload_loop(10))
+    gc.collect()
+    threads = threading.active_count()
+
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    refs = asyncio.run(_reload_loop(RELOADS))
+    gc.collect()
+    growth = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename")
+    )
+    tracemalloc.stop()
+
+    assert not devices
+    assert all(ref() is None for ref in refs)
+    assert SprayMistF638.instances == 0
+    assert threading.active_count() <= threads
+    assert growth < 64 * 1024
+
+
+def test_shutdown_cancels_pending_poll():
+    """Unloading while a poll is in flight cancels it and drops the handle."""
+
+    async def run() -> None:
+        device = create_device(MAC, "WaterTimer")
+        started = asyncio.Event()
+        original = device._perform_update
+
+        async def slow_update():
+            started.set()
+            await asyncio.sleep(60)
+            await original()
+
+        device._perform_update = slow_update
+        poll = asyncio.create_task(device.update(force=True))
+        await started.wait()
+        await async_remove_device(MAC)
+
+        assert poll.cancelled() or poll.done()
+        assert device._device_handle is None
+        assert not device._tasks
+        await device.update(force=True)
+        assert device._device_handle is None
+
+    asyncio.run(run())
+    assert not devices